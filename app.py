@@ -1,61 +1,197 @@
 import os
-import base64 
+import logging
+import queue
+import re
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, flash
-from werkzeug.utils import secure_filename
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+from flask import Flask, stream_template, request, redirect, url_for, flash, get_flashed_messages
 
 app = Flask(__name__)
 app.secret_key = "a_strong_secret_key_for_session_management_2024" 
-app.config['ENV'] = 'development'
-app.config['DEBUG'] = True
+app.config['DEBUG'] = os.environ.get('FLASK_DEBUG') == '1'
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'school.db')
 app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'static', 'uploads')
+UPLOAD_DIR = app.config['UPLOAD_FOLDER']
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+DB_POOL_SIZE = 8
+DB_CACHED_STATEMENTS = 256
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DB_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA foreign_keys=ON;
+'''
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=DB_CACHED_STATEMENTS)
+    conn.executescript(DB_PRAGMAS)
     conn.row_factory = sqlite3.Row
     return conn
 
+class ConnectionPool:
+    def __init__(self, size):
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(get_db_connection())
+
+    @contextmanager
+    def acquire(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._connections.put(conn)
+
+pool = ConnectionPool(DB_POOL_SIZE)
+
+_LIST_COLUMNS = 'id, idno, lastname, firstname, course, level, image_file'
+_Q_LIST = f'SELECT {_LIST_COLUMNS} FROM students ORDER BY id DESC LIMIT ?'
+_Q_LIST_BEFORE = f'SELECT {_LIST_COLUMNS} FROM students WHERE id < ? ORDER BY id DESC LIMIT ?'
+_Q_INSERT = '''
+    INSERT INTO students (idno, lastname, firstname, course, level, image_file)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(idno) DO NOTHING
+    RETURNING id
+'''
+_Q_DELETE = 'DELETE FROM students WHERE id = ? RETURNING image_file, firstname, lastname'
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+DATA_URI_MARKER = b'base64,'
+DATA_URI_MAX_HEADER = 256
+
+UPLOAD_OPEN_FLAGS = (os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+                     | getattr(os, 'O_CLOEXEC', 0) | getattr(os, 'O_BINARY', 0))
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+    return len(data)
+
+def save_upload(image, file_path):
+    fd = os.open(file_path, UPLOAD_OPEN_FLAGS, 0o644)
+    try:
+        for chunk in iter(lambda: image.stream.read(UPLOAD_CHUNK_SIZE), b''):
+            write_all(fd, chunk)
+    finally:
+        os.close(fd)
+
+_upload_buffers = threading.local()
+
+def get_upload_buffer():
+    # Reused per thread: room for the leftover of the header read plus one chunk.
+    buffer = getattr(_upload_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _upload_buffers.buffer = bytearray(DATA_URI_MAX_HEADER + 2 * UPLOAD_CHUNK_SIZE)
+    return buffer
+
+def save_data_uri_stream(stream, file_path):
+    # The marker belongs to the short 'data:image/...;base64,' header, so only
+    # the start of the body is searched; anything else is rejected early.
+    buffer = b''
+    while True:
+        marker_at = buffer.find(DATA_URI_MARKER, 0, DATA_URI_MAX_HEADER)
+        if marker_at != -1:
+            break
+        if len(buffer) >= DATA_URI_MAX_HEADER:
+            return None
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return None
+        buffer += chunk
+    buffer = buffer[marker_at + len(DATA_URI_MARKER):]
+
+    view = memoryview(get_upload_buffer())
+    pending = len(buffer)
+    view[:pending] = buffer
+    written = 0
+    try:
+        fd = os.open(file_path, UPLOAD_OPEN_FLAGS, 0o644)
+        try:
+            while True:
+                read = stream.readinto(view[pending:pending + UPLOAD_CHUNK_SIZE])
+                end = pending + read
+                # Decode whole 4-character groups only; the remainder waits for the next chunk.
+                usable = end - end % 4 if read else end
+                written += write_all(fd, b64decode(view[:usable], validate=False))
+                pending = end - usable
+                view[:pending] = view[usable:end]
+                if not read:
+                    break
+        finally:
+            os.close(fd)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return written
+
 def init_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            idno VARCHAR(10) NOT NULL UNIQUE,
-            lastname VARCHAR(25) NOT NULL,
-            firstname VARCHAR(25) NOT NULL,
-            course VARCHAR(10) NOT NULL,
-            level VARCHAR(5) NOT NULL,
-            image_file VARCHAR(100) DEFAULT 'default_user.png'
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_idno ON students(idno)
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+    with pool.acquire() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idno VARCHAR(10) NOT NULL UNIQUE,
+                lastname VARCHAR(25) NOT NULL,
+                firstname VARCHAR(25) NOT NULL,
+                course VARCHAR(10) NOT NULL,
+                level VARCHAR(5) NOT NULL,
+                image_file VARCHAR(100) DEFAULT 'default_user.png'
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_idno ON students(idno)
+        ''')
+
+if not os.path.exists(UPLOAD_DIR):
+    os.makedirs(UPLOAD_DIR)
 init_database()
 
 @app.route('/')
 def index():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM students ORDER BY id DESC')
-    rows = cursor.fetchall()
-    conn.close()
-    students = [dict(row) for row in rows]
-    return render_template('index.html', students=students)
+    before_id = request.args.get('before_id', type=int)
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    # One extra row is fetched to tell whether an older page exists; it is not rendered.
+    page = {'next_before_id': None}
+
+    def iter_students():
+        with pool.acquire() as conn:
+            if before_id is None:
+                cursor = conn.execute(_Q_LIST, (limit + 1,))
+            else:
+                cursor = conn.execute(_Q_LIST_BEFORE, (before_id, limit + 1))
+            for count, student in enumerate(cursor, 1):
+                if count > limit:
+                    page['next_before_id'] = last_id
+                    break
+                last_id = student['id']
+                yield student
+            cursor.close()
+
+    # Pop the flashed messages now: the session cookie is saved before the
+    # streamed body is rendered, so popping them inside the template is lost.
+    get_flashed_messages()
+    return app.response_class(stream_template('index.html', students=iter_students(),
+                                              limit=limit, before_id=before_id, page=page))
 
 @app.route('/savestudent', methods=['POST'])
 def save_student_from_webcam():
@@ -69,124 +205,74 @@ def save_student_from_webcam():
         if not all([idno, lastname, firstname, course, level]):
             return "Error: All student fields are required.", 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM students WHERE idno = ?', (idno,))
-        if cursor.fetchone():
-            conn.close()
-            return "Error: ID Number already exists. Use a unique ID.", 409
+        filename = f"{UNSAFE_FILENAME_CHARS.sub('', idno)}_{time.time_ns()}.jpeg"
+        file_path = f"{UPLOAD_DIR}{os.sep}{filename}"
 
-        image_data_b64 = None
-        
-        try:
-            if request.data and len(request.data) > 0:
-                try:
-                    image_data_b64 = request.data.decode('utf-8')
-                    if app.config['DEBUG']:
-                        print(f"DEBUG: Got image from request.data, length: {len(image_data_b64)}")
-                except UnicodeDecodeError:
-                    pass
-            
-            if not image_data_b64 and request.form:
-                for field_name in ['file', 'image', 'webcam', 'data']:
-                    if field_name in request.form:
-                        image_data_b64 = request.form[field_name]
-                        if app.config['DEBUG']:
-                            print(f"DEBUG: Got image from request.form['{field_name}']")
-                        break
-            
-            if not image_data_b64:
-                try:
-                    raw_data = request.get_data(as_text=True)
-                    if raw_data and len(raw_data) > 0 and 'data:image' in raw_data:
-                        image_data_b64 = raw_data
-                        if app.config['DEBUG']:
-                            print(f"DEBUG: Got image from request.get_data(), length: {len(image_data_b64)}")
-                except Exception as e:
-                    if app.config['DEBUG']:
-                        print(f"DEBUG: Error getting raw data: {e}")
-            
-            if not image_data_b64 and request.is_json and request.json:
-                image_data_b64 = request.json.get('image') or request.json.get('file') or request.json.get('data')
-                if image_data_b64 and app.config['DEBUG']:
-                    print("DEBUG: Got image from JSON")
-                    
-        except Exception as e:
-            print(f"Error decoding request data: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        if app.config['DEBUG']:
-            print(f"DEBUG: Request method: {request.method}")
-            print(f"DEBUG: Request data length: {len(request.data) if request.data else 0}")
-            print(f"DEBUG: Content-Type: {request.content_type}")
-            print(f"DEBUG: Has form data: {bool(request.form)}")
-            if request.form:
-                print(f"DEBUG: Form keys: {list(request.form.keys())}")
-                for key in request.form.keys():
-                    val = request.form[key]
-                    print(f"DEBUG: Form[{key}] = {str(val)[:50]}... (length: {len(str(val))})")
-            if image_data_b64:
-                print(f"DEBUG: Image data preview: {image_data_b64[:100]}...")
-                print(f"DEBUG: Image data total length: {len(image_data_b64)}")
-            else:
-                print("DEBUG: No image data found in request")
-                print(f"DEBUG: request.data type: {type(request.data)}")
-                print(f"DEBUG: request.data content (first 200 chars): {str(request.data)[:200] if request.data else 'None'}")
-        
-        if not image_data_b64:
-            return "Error: No image data received. Please take a picture using the TAKE PHOTO button first.", 400
-        
-        if 'base64,' not in image_data_b64:
-            return "Error: Invalid image format. Please take a new picture using the TAKE PHOTO button.", 400
+        if request.mimetype == 'multipart/form-data':
+            image = request.files.get('image')
+            if not image:
+                return "Error: No image data received. Please take a picture using the TAKE PHOTO button first.", 400
 
-        header, base64_data = image_data_b64.split('base64,', 1)
-        extension = '.jpeg' 
+            if app.logger.isEnabledFor(logging.DEBUG):
+                app.logger.debug("Saving multipart image upload, Content-Type: %s, length: %s", image.mimetype, request.content_length)
 
-        image_binary = base64.b64decode(base64_data)
+        else:
+            image = None
+            if not request.content_length:
+                return "Error: No image data received. Please take a picture using the TAKE PHOTO button first.", 400
 
-        filename = f"{secure_filename(idno)}_{datetime.now().strftime('%Y%m%d%H%M%S')}{extension}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            if app.logger.isEnabledFor(logging.DEBUG):
+                app.logger.debug("Streaming image upload, Content-Type: %s, length: %s", request.content_type, request.content_length)
 
-        with open(file_path, 'wb') as f:
-            f.write(image_binary)
-        
-        cursor.execute('''
-            INSERT INTO students (idno, lastname, firstname, course, level, image_file)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (idno, lastname, firstname, course, level, filename))
-        conn.commit()
-        conn.close()
+        # The body is written before the transaction starts, so the write lock
+        # is held for the INSERT only and not for the upload's network read.
+        tmp_path = file_path + '.tmp'
+        try:
+            if image:
+                save_upload(image, tmp_path)
+            elif save_data_uri_stream(request.stream, tmp_path) is None:
+                return "Error: Invalid image format. Please take a new picture using the TAKE PHOTO button.", 400
+
+            with pool.acquire() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(_Q_INSERT, (idno, lastname, firstname, course, level, filename))
+                if cursor.fetchone() is None:
+                    conn.rollback()
+                    os.remove(tmp_path)
+                    return "Error: ID Number already exists. Use a unique ID.", 409
+                conn.commit()
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, file_path)
         
         return "Student Saved Successfully", 200
 
     except Exception as e:
-        print(f"An unexpected error occurred during save: {e}")
+        app.logger.exception("An unexpected error occurred during save: %s", e)
         return f"Internal Server Error: Failed to process request due to: {e}", 500
 
 @app.route('/delete/<int:id>', methods=['POST'])
 def delete_student(id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM students WHERE id = ?', (id,))
-        student = cursor.fetchone()
-        
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(_Q_DELETE, (id,))
+            student = cursor.fetchone()
+            cursor.close()
+            
         if not student:
-            conn.close()
             flash(f"Student with ID {id} not found", "danger")
             return redirect(url_for('index'))
         
         image_file = student['image_file']
         if image_file and image_file != 'default_user.png':
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], image_file)
+            file_path = f"{UPLOAD_DIR}{os.sep}{image_file}"
             if os.path.exists(file_path):
                 os.remove(file_path)
-
-        cursor.execute('DELETE FROM students WHERE id = ?', (id,))
-        conn.commit()
-        conn.close()
         
         flash(f"Student {student['firstname']} {student['lastname']} Deleted Successfully", "warning")
     except Exception as e:
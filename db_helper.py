@@ -1,11 +1,13 @@
 import sqlite3
 import os
+import sys
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'school.db')
 
 def db_helper():
     conn = sqlite3.connect(DB_PATH)
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -37,8 +39,10 @@ def db_helper():
         columns = cursor.fetchall()
         print("\nTable structure:")
         print("-" * 60)
-        for col in columns:
-            print(f"  {col[1]:15} {col[2]:15} {'NOT NULL' if col[3] else 'NULL':10} {'PRIMARY KEY' if col[5] else ''}")
+        sys.stdout.write('\n'.join(
+            f"  {col[1]:15} {col[2]:15} {'NOT NULL' if col[3] else 'NULL':10} {'PRIMARY KEY' if col[5] else ''}"
+            for col in columns
+        ) + '\n')
         print("-" * 60)
     else:
         print("✗ Error: Table was not created")
@@ -0,0 +1,11 @@
+import multiprocessing
+
+bind = '0.0.0.0:8000'
+worker_class = 'gthread'
+workers = multiprocessing.cpu_count()
+# One pooled SQLite connection per thread (see DB_POOL_SIZE in app.py).
+threads = 8
+max_requests = 1000
+max_requests_jitter = 100
+# Static files and uploads go out through wsgi.file_wrapper, i.e. sendfile(2).
+sendfile = True